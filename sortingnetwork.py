@@ -24,14 +24,38 @@
 
 import argparse
 import ast
+import bisect
+import functools
+import multiprocessing
 import sys
+from typing import Callable, Iterable
+
+# Largest number of inputs for which is_sorting_network() uses bit-sliced evaluation of all 2^n inputs.
+# Above this, a depth-first search is used instead.
+_BIT_SLICE_MAX_INPUTS = 24
+
+# Number of inputs whose 2^n binary sequences are evaluated together in one chunk by bit-sliced evaluation.
+# This limits the memory used to n * 2^20 bits. Networks with more inputs are evaluated in multiple chunks.
+_BIT_SLICE_CHUNK_INPUTS = 20
+
+# Number of branches per process to split the depth-first search into when checking with multiple processes.
+# More branches than processes are used so the work stays balanced when some branches take longer than others.
+_BRANCHES_PER_JOB = 16
+
+# Smallest number of comparators in a sorting network for n inputs, indexed by n, where it is known to be optimal.
+# https://en.wikipedia.org/wiki/Sorting_network#Optimal_sorting_networks
+_MIN_COMPARATORS = (0, 0, 1, 3, 5, 9, 12, 16, 19, 25, 29, 35, 39)
 
 
 class Comparator:
     """
     A comparator is defined by two input positions.
+
+    Comparators cannot be modified after they are created, so values derived from the input positions stay correct.
     """
 
+    __slots__ = ("_i1", "_i2", "_mask1", "_mask2", "_mask")
+
     def __init__(self, i1: int, i2: int):
         """
         Initialize a comparator with two input positions.
@@ -44,11 +68,50 @@ class Comparator:
         if i1 == i2:
             raise ValueError("Comparator inputs must be different")
         if i1 < i2:
-            self.i1 = i1
-            self.i2 = i2
+            self._i1 = i1
+            self._i2 = i2
         else:
-            self.i1 = i2
-            self.i2 = i1
+            self._i1 = i2
+            self._i2 = i1
+        # Bit masks used when applying this comparator to binary sequences
+        self._mask1 = 1 << self._i1
+        self._mask2 = 1 << self._i2
+        self._mask = self._mask1 | self._mask2
+
+    @property
+    def i1(self) -> int:
+        """
+        The smaller input position.
+        """
+        return self._i1
+
+    @property
+    def i2(self) -> int:
+        """
+        The larger input position.
+        """
+        return self._i2
+
+    @property
+    def mask1(self) -> int:
+        """
+        Bit mask of the smaller input position.
+        """
+        return self._mask1
+
+    @property
+    def mask2(self) -> int:
+        """
+        Bit mask of the larger input position.
+        """
+        return self._mask2
+
+    @property
+    def mask(self) -> int:
+        """
+        Bit mask of both input positions.
+        """
+        return self._mask
 
     @staticmethod
     def from_string(s: str):
@@ -60,24 +123,27 @@ class Comparator:
         :param s: String in the format "i1:i2"
         :return: Comparator created from the string
         """
-        inputs = s.strip().split(":")
-        if len(inputs) != 2:
-            raise ValueError(f"Invalid comparator string: {s}")
-        if not inputs[0].isnumeric() or not inputs[1].isnumeric():
+        i1, _, i2 = s.strip().partition(":")
+        # This also rejects strings without a colon or with more than one colon, since i2 would not be all digits
+        if not i1.isdecimal() or not i2.isdecimal():
             raise ValueError(f"Invalid comparator string: {s}")
-        return Comparator(int(inputs[0]), int(inputs[1]))
+        return Comparator(int(i1), int(i2))
 
     def __str__(self) -> str:
-        return f"{self.i1}:{self.i2}"
+        return f"{self._i1}:{self._i2}"
 
     def __repr__(self) -> str:
         return self.__str__()
 
     def __hash__(self) -> int:
-        return f"{self.i1}:{self.i2}".__hash__()
+        return hash((self._i1, self._i2))
+
+    def __reduce__(self) -> tuple:
+        # Pickle only the input positions, since the other attributes are derived from them
+        return Comparator, (self._i1, self._i2)
 
     def __eq__(self, other: 'Comparator') -> bool:
-        return self.i1 == other.i1 and self.i2 == other.i2
+        return self._i1 == other._i1 and self._i2 == other._i2
 
     def overlaps(self, other: 'Comparator') -> bool:
         """
@@ -85,10 +151,10 @@ class Comparator:
         :param other: Comparator to compare against
         :return: True if the comparators overlap, False otherwise
         """
-        return (self.i1 < other.i1 < self.i2) or \
-            (self.i1 < other.i2 < self.i2) or \
-            (other.i1 < self.i1 < other.i2) or \
-            (other.i1 < self.i2 < other.i2)
+        # An input position of one comparator is strictly between the input positions of the other if and only if
+        # the two ranges intersect and are not identical.
+        return self._i1 < other._i2 and other._i1 < self._i2 and \
+            (self._i1 != other._i1 or self._i2 != other._i2)
 
     def has_same_input(self, other: 'Comparator') -> bool:
         """
@@ -96,10 +162,7 @@ class Comparator:
         :param other: Comparator to compare against
         :return: True if the comparators have the same input, False otherwise
         """
-        return self.i1 == other.i1 or \
-            self.i1 == other.i2 or \
-            self.i2 == other.i1 or \
-            self.i2 == other.i2
+        return self._mask & other._mask != 0
 
 
 class ComparisonNetwork:
@@ -107,11 +170,48 @@ class ComparisonNetwork:
     A comparison network is a collection of comparators that can be used to sort a sequence of items.
     """
 
+    __slots__ = ("_comparators", "_cached_comparators", "_max_input", "_pairs", "_binary_sorter", "_optimized_comparators",
+                 "_svg")
+
     def __init__(self):
         """
         Initialize a comparison network with an empty list of comparators.
         """
-        self.comparators: list[Comparator] = []
+        self.comparators = []
+
+    @property
+    def comparators(self) -> list[Comparator]:
+        """
+        The list of comparators in the comparison network.
+        """
+        return self._comparators
+
+    @comparators.setter
+    def comparators(self, comparators: list[Comparator]) -> None:
+        self._comparators = comparators
+        self._invalidate_cache()
+
+    def _invalidate_cache(self) -> None:
+        """
+        Discard any cached data derived from the comparators.
+        """
+        self._cached_comparators = None
+        self._max_input = None
+        self._pairs = None
+        self._binary_sorter = None
+        self._optimized_comparators = None
+        self._svg = None
+
+    def _check_cache(self) -> None:
+        """
+        Discard any cached data derived from the comparators if the comparators have changed since it was cached.
+
+        The comparators are compared against a copy taken when the cache was started, so changes made by modifying the
+        comparators list in place are detected too.
+        """
+        if self._cached_comparators != self._comparators:
+            self._invalidate_cache()
+            self._cached_comparators = self._comparators.copy()
 
     @staticmethod
     def from_file(filename: str) -> 'ComparisonNetwork':
@@ -120,16 +220,13 @@ class ComparisonNetwork:
         :param filename: File to read from
         :return: Comparison network read from the file
         """
-        cn = ComparisonNetwork()
         if filename:
             with open(filename, 'r') as f:
-                for line in f:
-                    for c in line.split(","):
-                        cn.append(Comparator.from_string(c))
+                lines = f.read().splitlines()
         else:
-            for line in sys.stdin:
-                for c in line.split(","):
-                    cn.append(Comparator.from_string(c))
+            lines = sys.stdin.read().splitlines()
+        cn = ComparisonNetwork()
+        cn.comparators = [Comparator.from_string(c) for line in lines for c in line.split(",")]
         return cn
 
     @staticmethod
@@ -140,22 +237,23 @@ class ComparisonNetwork:
         :return: Comparison network read from the string
         """
         cn = ComparisonNetwork()
-        for c in s.split(","):
-            cn.append(Comparator.from_string(c))
+        cn.comparators = [Comparator.from_string(c) for c in s.split(",")]
         return cn
 
     def __str__(self) -> str:
-        result = ""
+        lines = []
         group = []
+        group_inputs = 0
         for c in self._get_optimized_comparators():
-            for other in group:
-                if c.has_same_input(other):
-                    result += ','.join(map(str, group)) + "\n"
-                    del group[:]
-                    break
-            group.append(c)
-        result += ','.join(map(str, group))
-        return result
+            # If the comparator shares an input with any other comparator in the group, then start a new line
+            if group_inputs & c.mask:
+                lines.append(','.join(group))
+                group = []
+                group_inputs = 0
+            group.append(str(c))
+            group_inputs |= c.mask
+        lines.append(','.join(group))
+        return "\n".join(lines)
 
     def __repr__(self) -> str:
         return self.__str__()
@@ -163,12 +261,21 @@ class ComparisonNetwork:
     def __getitem__(self, index: int) -> Comparator:
         return self.comparators[index]
 
+    def __getstate__(self) -> dict:
+        # Only the comparators are pickled. The cached data can be derived from them again, and the generated binary
+        # sorter function cannot be pickled.
+        return {"comparators": self.comparators}
+
+    def __setstate__(self, state: dict) -> None:
+        self.comparators = state["comparators"]
+
     def append(self, c: Comparator) -> None:
         """
         Add a comparator to the comparison network.
         :param c: Comparator to add
         """
         self.comparators.append(c)
+        self._invalidate_cache()
 
     def remove(self, c: Comparator) -> None:
         """
@@ -176,29 +283,74 @@ class ComparisonNetwork:
         :param c: Comparator to remove
         """
         self.comparators.remove(c)
+        self._invalidate_cache()
 
-    def is_sorting_network(self, show_progress: bool = False) -> bool:
+    def is_sorting_network(self, show_progress: bool = False, jobs: int = 1) -> bool:
         """
         Determine if this comparison network is a sorting network.
         :param show_progress: Whether to show progress while checking
+        :param jobs: Number of processes to use when checking comparison networks with a depth-first search, which is
+            used for more than _BIT_SLICE_MAX_INPUTS inputs
         :return: True if this comparison network is a sorting network, False otherwise
         """
         if len(self.comparators) == 0:
             return False
         # Use the zero-one principle to determine if this comparison network is a sorting network
         # https://en.wikipedia.org/wiki/Sorting_network#Zero-one_principle
+        # The zero-one principle shows that it is sufficient to verify 2^n types of inputs.
+        # For small n, all 2^n inputs are checked at once using bit-sliced evaluation.
+        # For larger n, the inputs are classified into O(1.618^n) branches using depth-first search.
+        m, n = len(self.comparators), (self.get_max_input() + 1)
+        # A network with fewer comparators than the smallest possible sorting network cannot be a sorting network
+        if m < ComparisonNetwork._get_min_comparators(n):
+            return False
+        # In a sorting network, every output depends on every input, so first do a quick check of which inputs can
+        # reach each line. This rejects many non-sorting networks in O(m) time, before the exponential check below.
+        reachable = [1 << k for k in range(n)]
+        for i1, i2 in self._get_pairs():
+            reachable[i1] = reachable[i2] = reachable[i1] | reachable[i2]
+        all_inputs = (1 << n) - 1
+        if any(r != all_inputs for r in reachable):
+            return False
+        if n <= _BIT_SLICE_MAX_INPUTS:
+            return self._is_sorting_network_bit_sliced(n, show_progress)
+        return self._is_sorting_network_depth_first(n, show_progress, jobs)
+
+    def _is_sorting_network_depth_first(self, n: int, show_progress: bool = False, jobs: int = 1) -> bool:
+        """
+        Determine if this comparison network is a sorting network using a depth-first search over three-valued line states.
+        :param n: Number of inputs
+        :param show_progress: Whether to show progress while checking
+        :param jobs: Number of processes to search with
+        :return: True if this comparison network is a sorting network, False otherwise
+        """
         # time complexity: O(m * 1.618^n) where m is the number of comparators,
         # n is the number of inputs and 1.618 is the golden ratio
         # refer: Hisayasu Kuroda. (1997). A proposal of Gap Decrease Sorting Network.
         # Trans.IPS.Japan, vol.38, no.3, p.381-389. http://id.nii.ac.jp/1001/00013442/
-        # The zero-one principle shows that it is sufficient to verify 2^n types of inputs.
         # This algorithm classifies 2^n inputs and performs depth-first search
         # by dividing into O(1.618^n) branches.
-        m, n = len(self.comparators), (self.get_max_input() + 1)
         # Reduce class object property reads for optimization performance
-        cmps = list(map(lambda x: (x.i1, x.i2), self.comparators))
+        cmps = self._get_pairs()
         # initial p state is all '#'=unknown: not determined to be 0 or 1
         stack = [(0, [2] * n, 0, n - 1)]
+        if jobs > 1:
+            return ComparisonNetwork._search_branches_in_parallel(cmps, stack, jobs, show_progress)
+        return ComparisonNetwork._search_branches(cmps, stack, len(cmps), show_progress)
+
+    @staticmethod
+    def _search_branches(cmps: list[tuple[int, int]], stack: list, end: int, show_progress: bool = False, frontier: list | None = None) -> bool:
+        """
+        Search the branches on the stack depth-first, applying the comparators before index end.
+
+        :param cmps: Input positions of each comparator
+        :param stack: Branches to search, as (i, p, z, o) tuples (see below)
+        :param end: Index of the comparator to stop at
+        :param show_progress: Whether to show progress while checking
+        :param frontier: If given, branches that are not sorted when they reach end are added to this list instead of failing the search
+        :return: False if any branch is not sorted after applying all comparators, True otherwise
+        """
+        m = end
         # Progress is measured in 128 is 100%
         progress, prev_progress = 0, -1
         try:
@@ -306,6 +458,10 @@ class ComparisonNetwork:
                             # if p is sorted in this branch:
                             break  # continue 'a
                 else:
+                    if frontier is not None:
+                        # Leave this branch to be searched further later
+                        frontier.append((i, p, z, o))
+                        continue  # continue 'a
                     # If there is any branch where the sequence
                     # is not sorted using all comparators
                     return False
@@ -319,6 +475,119 @@ class ComparisonNetwork:
             if show_progress:
                 print("\r", end="")
 
+    @staticmethod
+    def _search_branches_in_parallel(cmps: list[tuple[int, int]], stack: list, jobs: int, show_progress: bool = False) -> bool:
+        """
+        Search the branches on the stack depth-first, spread across multiple processes.
+
+        The first comparators are applied in this process until there are enough independent branches to share between
+        the processes. Each of those branches is then searched to the end in a process pool.
+
+        :param cmps: Input positions of each comparator
+        :param stack: Branches to search, as (i, p, z, o) tuples
+        :param jobs: Number of processes to search with
+        :param show_progress: Whether to show progress while checking
+        :return: False if any branch is not sorted after applying all comparators, True otherwise
+        """
+        m = len(cmps)
+        end = 0
+        while stack and end < m and len(stack) < jobs * _BRANCHES_PER_JOB:
+            end += 1
+            frontier = []
+            ComparisonNetwork._search_branches(cmps, stack, end, frontier=frontier)
+            stack = frontier
+        if not stack:
+            return True
+
+        prev_percent_complete = -1
+        try:
+            # Leaving the pool terminates its processes, so returning early does not wait for the remaining branches,
+            # including the ones that are already being searched
+            with multiprocessing.Pool(jobs) as pool:
+                search_branch = functools.partial(ComparisonNetwork._search_branches, cmps, end=m)
+                for k, is_sorted in enumerate(pool.imap_unordered(search_branch, ([branch] for branch in stack))):
+                    if not is_sorted:
+                        return False
+                    if show_progress:
+                        percent_complete = (100 * (k + 1)) // len(stack)
+                        if percent_complete != prev_percent_complete:
+                            prev_percent_complete = percent_complete
+                            print(f"\rChecking... {percent_complete}%", end="")
+            return True
+        finally:
+            if show_progress:
+                print("\r", end="")
+
+    @staticmethod
+    def _get_min_comparators(n: int) -> int:
+        """
+        Get a lower bound on the number of comparators in a sorting network with n inputs.
+
+        This is exact where the optimal size is known. For larger n, it is extended using the Van Voorhis bound
+        S(n) >= S(n-1) + ceil(log2(n)).
+
+        :param n: Number of inputs
+        :return: Lower bound on the number of comparators
+        """
+        if n < len(_MIN_COMPARATORS):
+            return _MIN_COMPARATORS[n]
+        result = _MIN_COMPARATORS[-1]
+        for k in range(len(_MIN_COMPARATORS), n + 1):
+            result += (k - 1).bit_length()
+        return result
+
+    def _is_sorting_network_bit_sliced(self, n: int, show_progress: bool = False) -> bool:
+        """
+        Determine if this comparison network is a sorting network by evaluating all 2^n binary inputs at once.
+
+        Each input line is represented by a single integer with 2^n bits, where bit j holds the value of that line
+        for input sequence j. A comparator then becomes two bitwise operations on whole lines, so 2^n sequences are
+        sorted in parallel without any per-sequence Python overhead.
+
+        To limit memory use, the sequences are evaluated in chunks of 2^20 at a time, where each chunk has fixed
+        values for the inputs above the first 20.
+
+        :param n: Number of inputs
+        :param show_progress: Whether to show progress while checking
+        :return: True if this comparison network is a sorting network, False otherwise
+        """
+        chunk_inputs = min(n, _BIT_SLICE_CHUNK_INPUTS)
+        size = 1 << chunk_inputs
+        all_ones = (1 << size) - 1
+        # Line k starts out as the repeating pattern of 2^k zeros followed by 2^k ones, which is bit k of j for every j.
+        initial_lines = []
+        for k in range(chunk_inputs):
+            width = 1 << k
+            pattern = ((1 << width) - 1) << width
+            width <<= 1
+            while width < size:
+                pattern |= pattern << width
+                width <<= 1
+            initial_lines.append(pattern)
+        pairs = self._get_pairs()
+        chunk_count = 1 << (n - chunk_inputs)
+        prev_percent_complete = -1
+        try:
+            for chunk in range(chunk_count):
+                # The lines above the first chunk_inputs are all zeros or all ones, according to the bits of the chunk number
+                lines = initial_lines + [all_ones if (chunk >> k) & 1 else 0 for k in range(n - chunk_inputs)]
+                for i1, i2 in pairs:
+                    # min(a, b) is a AND b, max(a, b) is a OR b
+                    a, b = lines[i1], lines[i2]
+                    lines[i1], lines[i2] = a & b, a | b
+                # Every output is sorted if no sequence has a 1 on a line followed by a 0 on the next line
+                if any(lines[k] & ~lines[k + 1] for k in range(n - 1)):
+                    return False
+                if show_progress:
+                    percent_complete = (100 * (chunk + 1)) // chunk_count
+                    if percent_complete != prev_percent_complete:
+                        prev_percent_complete = percent_complete
+                        print(f"\rChecking... {percent_complete}%", end="")
+            return True
+        finally:
+            if show_progress:
+                print("\r", end="")
+
     def sort_binary_sequence(self, sequence: int) -> int:
         """
         Sort a binary sequence using this comparison network.
@@ -328,15 +597,39 @@ class ComparisonNetwork:
         :param sequence: An integer representing a binary sequence to sort
         :return: An integer representing the sorted binary sequence
         """
-        result = sequence
-        # Apply all comparators to the binary sequence
-        for c in self.comparators:
-            # Compare the two bits at the comparator's input positions and swap if needed
-            pos0 = (result >> c.i1) & 1
-            pos1 = (result >> c.i2) & 1
-            if pos0 > pos1:
-                result ^= (1 << c.i1) | (1 << c.i2)
-        return result
+        return self._get_binary_sorter()(sequence)
+
+    def sort_binary_sequences(self, sequences: Iterable[int]) -> list[int]:
+        """
+        Sort many binary sequences using this comparison network.
+
+        This is equivalent to calling sort_binary_sequence() for each sequence, but avoids the per-call overhead.
+
+        :param sequences: Integers representing binary sequences to sort
+        :return: A list of integers representing the sorted binary sequences, in the same order
+        """
+        return list(map(self._get_binary_sorter(), sequences))
+
+    def _get_binary_sorter(self) -> Callable[[int], int]:
+        """
+        Get a function that sorts a binary sequence using this comparison network.
+
+        The function is generated with every comparator written out as straight-line code using its bit masks as
+        constants, which avoids the overhead of looping over the comparators for every sequence.
+
+        :return: Function that takes and returns an integer representing a binary sequence
+        """
+        self._check_cache()
+        if self._binary_sorter is None:
+            lines = ["def sort_binary_sequence(result):"]
+            for c in self.comparators:
+                # Swap the two bits at the comparator's input positions if the first is 1 and the second is 0
+                lines.append(f"    if result & {c.mask1} and not result & {c.mask2}: result ^= {c.mask}")
+            lines.append("    return result")
+            namespace = {}
+            exec(compile("\n".join(lines), "<sort_binary_sequence>", "exec"), namespace)
+            self._binary_sorter = namespace["sort_binary_sequence"]
+        return self._binary_sorter
 
     def sort_sequence(self, sequence: list) -> list:
         """
@@ -347,23 +640,38 @@ class ComparisonNetwork:
         if len(sequence) != self.get_max_input()+1:
             raise ValueError("Sequence length does not match number of inputs in the comparison network")
         result = list(sequence)
-        for c in self.comparators:
-            if result[c.i1] > result[c.i2]:
-                result[c.i1], result[c.i2] = result[c.i2], result[c.i1]
+        for i1, i2 in self._get_pairs():
+            a = result[i1]
+            b = result[i2]
+            if a > b:
+                result[i1] = b
+                result[i2] = a
         return result
 
+    def _get_pairs(self) -> list[tuple[int, int]]:
+        """
+        Get the input positions of each comparator.
+
+        The positions are stored as a flat list of tuples, which is faster to iterate over than the comparator objects.
+
+        :return: List of (i1, i2) tuples, one for each comparator
+        """
+        self._check_cache()
+        if self._pairs is None:
+            self._pairs = [(c.i1, c.i2) for c in self.comparators]
+        return self._pairs
+
     def get_max_input(self) -> int:
         """
         Get the maximum input position used by any comparator in the comparison network.
         :return: The maximum input position
         """
-        if len(self.comparators) == 0:
-            raise ValueError("Comparison network is empty")
-        max_input = 0
-        for c in self.comparators:
-            if c.i2 > max_input:
-                max_input = c.i2
-        return max_input
+        self._check_cache()
+        if self._max_input is None:
+            if len(self.comparators) == 0:
+                raise ValueError("Comparison network is empty")
+            self._max_input = max(c.i2 for c in self.comparators)
+        return self._max_input
 
     def _get_optimized_comparators(self) -> list[Comparator]:
         """
@@ -372,10 +680,17 @@ class ComparisonNetwork:
         It groups comparators into depth groups, where each comparator in the group has non-conflicting inputs.
         It then adds each depth group to the result in an optimized order.
 
+        The result is cached until the comparators change, so it should not be modified.
+
         :return: List of comparators in an optimized order
         """
+        self._check_cache()
+        if self._optimized_comparators is not None:
+            return self._optimized_comparators
+
         # Make a copy of the comparators so we can keep track of which comparators are remaining.
-        remaining = self.comparators.copy()
+        # Each comparator is paired with its bit mask, which is checked once per depth.
+        remaining = [(c, c.mask) for c in self.comparators]
 
         # Add comparators until there are no more remaining
         result = []
@@ -384,26 +699,27 @@ class ComparisonNetwork:
             # We will add these as a group, so they can be arranged optimally together.
             current_depth_comparators = []
 
-            # Create a list to keep track of the comparators that have been considered at the current depth, whether they were added or not
-            considered = []
+            # Create a list of the comparators that could not be added at the current depth, to be considered at the next depth.
+            deferred = []
+
+            # Keep track of the inputs used by the comparators that have been considered at the current depth, whether they were added or not, as a bit mask
+            considered_inputs = 0
 
             # Find comparators that can be added at the current depth.
             # A comparator can be added if it does not share an input with any other comparator that has been considered at the current depth.
-            for c in remaining.copy():
-                can_add = True
-                for d in considered:
-                    if c.has_same_input(d):
-                        # This comparator cannot be added because it shares an input with another comparator that has been considered at the current depth.
-                        can_add = False
-                        break
-                if can_add:
+            for c, mask in remaining:
+                if considered_inputs & mask:
+                    # This comparator cannot be added because it shares an input with another comparator that has been considered at the current depth.
+                    deferred.append((c, mask))
+                else:
                     current_depth_comparators.append(c)
-                    remaining.remove(c)
-                considered.append(c)
+                considered_inputs |= mask
+            remaining = deferred
 
             # Add the comparators that were found at the current depth
             result.extend(ComparisonNetwork._optimize_comparator_depth_group(current_depth_comparators))
 
+        self._optimized_comparators = result
         return result
 
     @staticmethod
@@ -416,40 +732,41 @@ class ComparisonNetwork:
         :param comparators: List of comparators to organize
         :return: List of comparators in an optimized order
         """
-        # Make a copy of the comparators, so we can keep track of which comparators are remaining
-        remaining = comparators.copy()
-
-        # Determine how many comparators each comparator overlaps
+        # Determine how many comparators each comparator overlaps.
+        # Since no inputs are shared, a comparator overlaps every other comparator except the ones that end before it starts
+        # and the ones that start after it ends, which can be counted using binary search on the sorted start and end positions.
+        starts = sorted(c.i1 for c in comparators)
+        ends = sorted(c.i2 for c in comparators)
+        # The counts are keyed by each comparator's bit mask, which identifies it uniquely and is faster to hash.
         overlap_count = {}
-        for c in remaining:
-            overlap_count[c] = 0
-            for other in remaining:
-                if c.overlaps(other):
-                    overlap_count[c] += 1
-
-        # Add comparators until there are no more remaining
-        result = []
-        while len(remaining) > 0:
-            # Find the comparators that overlap the fewest other comparators
-            min_overlap_count = min(overlap_count.values())
-            min_overlap_comparators = [c for c in remaining if overlap_count[c] == min_overlap_count]
+        for c in comparators:
+            before = bisect.bisect_right(ends, c.i1)
+            after = len(starts) - bisect.bisect_left(starts, c.i2)
+            overlap_count[c.mask] = len(comparators) - 1 - before - after
+
+        # Order the comparators so that the ones that overlap the fewest other comparators come first.
+        # If multiple comparators have the same overlap, then the ones that have the largest input range come first,
+        # and after that, the ones with the smallest input position.
+        # The overlap counts do not change as comparators are added, so a single sort gives the same order as
+        # repeatedly picking the best remaining comparator.
+        return sorted(comparators, key=lambda c: (overlap_count[c.mask], c.i1 - c.i2, c.i1))
 
-            # If there are multiple comparators with the same minimal overlap, then limit to the ones that have the largest input range
-            if len(min_overlap_comparators) > 1:
-                max_input_range = max([c.i2 - c.i1 for c in min_overlap_comparators])
-                min_overlap_comparators = [c for c in min_overlap_comparators if c.i2 - c.i1 == max_input_range]
+    def svg(self) -> str:
+        """
+        Generate an SVG representation of the comparison network.
 
-            # Of the comparators that were found matching the above criteria, add the one with the smallest input position
-            comparator_to_add = min(min_overlap_comparators, key=lambda x: x.i1)
-            result.append(comparator_to_add)
-            remaining.remove(comparator_to_add)
-            overlap_count.pop(comparator_to_add)
+        The result is cached until the comparators change.
 
-        return result
+        :return: SVG representation of the comparison network
+        """
+        self._check_cache()
+        if self._svg is None:
+            self._svg = self._generate_svg()
+        return self._svg
 
-    def svg(self) -> str:
+    def _generate_svg(self) -> str:
         """
-        Generate an SVG representation of the comparison network.
+        Generate an SVG representation of the comparison network without using the cached result.
         :return: SVG representation of the comparison network
         """
         scale = 1
@@ -461,24 +778,21 @@ class ComparisonNetwork:
         comparator_line_width = 3
         comparator_radius = 9
 
-        comparators_svg = ""
+        comparator_paths = []
         w = x_scale
-        group = {}
+        group = []
+        group_inputs = 0
         for c in self._get_optimized_comparators():
 
             # If the comparator inputs are the same position as any other comparator in the group, then start a new group
-            for other in group:
-                if c.has_same_input(other):
-                    for _, pos in group.items():
-                        if pos > w:
-                            w = pos
-                    w += x_scale
-                    group = {}
-                    break
+            if group_inputs & c.mask:
+                w = max(w, *(pos for _, pos in group)) + x_scale
+                group = []
+                group_inputs = 0
 
             # Adjust the comparator x position to avoid overlapping any existing comparators in the group
             cx = w
-            for other, other_pos in group.items():
+            for other, other_pos in group:
                 if other_pos >= cx and c.overlaps(other):
                     cx = other_pos + x_scale_thin
 
@@ -486,13 +800,16 @@ class ComparisonNetwork:
             y1 = y_scale + c.i1 * y_scale
             y2 = y_scale + c.i2 * y_scale
             r = comparator_radius
-            comparators_svg += (
+            comparator_paths.append(
                 f"M{cx-r} {y1}a{r} {r} 0 1 1 {r+r} 0a{r} {r} 0 1 1-{r+r} 0z"
                 f"m{r} 0V{y2}"
                 f"m-{r} 0a{r} {r} 0 1 1 {r+r} 0a{r} {r} 0 1 1-{r+r} 0z"
             )
             # Add this comparator to the current group
-            group[c] = cx
+            group.append((c, cx))
+            group_inputs |= c.mask
+
+        comparators_svg = "".join(comparator_paths)
 
         # Generate line SVG path
         n = self.get_max_input() + 2
@@ -518,6 +835,7 @@ def main() -> int:
 
     check_parser = subparsers.add_parser("check", description="check whether it is a sorting network", help="check whether it is a sorting network")
     check_parser.add_argument("--show-progress", action="store_true", help="show percent complete while checking")
+    check_parser.add_argument("--jobs", "-j", metavar="jobs", type=int, default=1, help=f"number of processes to use when checking comparison networks with more than {_BIT_SLICE_MAX_INPUTS} inputs")
 
     print_parser = subparsers.add_parser("print", description="print the comparison network definition", help="print the comparison network definition")
     print_parser.add_argument("print_filename", metavar="filename", help="the file to save the output to", nargs='?', default='')
@@ -533,7 +851,7 @@ def main() -> int:
     cn = ComparisonNetwork.from_file(args.input)
 
     if args.command == "check":
-        if cn.is_sorting_network(show_progress=args.show_progress):
+        if cn.is_sorting_network(show_progress=args.show_progress, jobs=args.jobs):
             print("It is a sorting network!")
             return 0
         else:
@@ -550,8 +868,7 @@ def main() -> int:
 
     if args.command == "sort":
         input_sequence = ast.literal_eval(args.sort_sequence)
-        for sorted_item in cn.sort_sequence(input_sequence):
-            print(sorted_item)
+        sys.stdout.write("".join(f"{sorted_item}\n" for sorted_item in cn.sort_sequence(input_sequence)))
         return 0
 
     if args.command == "svg":
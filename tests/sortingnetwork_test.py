@@ -20,12 +20,37 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import functools
+import math
+import os
+import pickle
 import unittest
 import platform
 
 from sortingnetwork import Comparator, ComparisonNetwork
 
 
+# Example files are shared by several tests, so they are only read and parsed once.
+# The returned comparison networks are shared too, so tests must not modify them.
+@functools.lru_cache(maxsize=None)
+def _load_comparison_network(filename):
+    return ComparisonNetwork.from_file(filename)
+
+
+# Whether an example file is a sorting network is checked by more than one test, so it is only checked once.
+# Only comparison networks with more than 24 inputs use multiple processes, and those take a long time to check,
+# so the check is spread across all available cores.
+@functools.lru_cache(maxsize=None)
+def _is_sorting_network_file(filename):
+    return _load_comparison_network(filename).is_sorting_network(jobs=os.cpu_count() or 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_svg(filename):
+    with open(filename, "r") as f:
+        return f.read().strip()
+
+
 class ComparatorTests(unittest.TestCase):
     def test_comparator(self):
         test_cases = [
@@ -41,9 +66,37 @@ class ComparatorTests(unittest.TestCase):
                 c = Comparator(i1, i2)
                 self.assertEqual(c.i1, expected_i1)
                 self.assertEqual(c.i2, expected_i2)
+                self.assertEqual(c.mask1, 1 << expected_i1)
+                self.assertEqual(c.mask2, 1 << expected_i2)
+                self.assertEqual(c.mask, (1 << expected_i1) | (1 << expected_i2))
                 self.assertEqual(c.__str__(), expected_str)
                 self.assertEqual(c.__repr__(), expected_str)
 
+    def test_comparator_is_read_only(self):
+        c = Comparator(0, 1)
+        for name in ("i1", "i2", "mask1", "mask2", "mask"):
+            with self.subTest(name=name):
+                with self.assertRaises(AttributeError):
+                    setattr(c, name, 5)
+        self.assertEqual(c, Comparator(0, 1))
+        self.assertEqual(c.mask, 0b11)
+
+    def test_comparator_from_string(self):
+        test_cases = [
+            ("0:1", Comparator(0, 1)),
+            ("1:0", Comparator(0, 1)),
+            (" 2:10\n", Comparator(2, 10)),
+        ]
+        for s, expected in test_cases:
+            with self.subTest(s=s):
+                self.assertEqual(Comparator.from_string(s), expected)
+
+        invalid_test_cases = ["", "0", "0:", ":1", "0:1:2", "0,1", "-1:2", "0: 1", "a:b", "1:1"]
+        for s in invalid_test_cases:
+            with self.subTest(s=s):
+                with self.assertRaises(ValueError):
+                    Comparator.from_string(s)
+
     def test_comparator_eq(self):
         test_cases = [
             (Comparator(0, 1), Comparator(0, 1), True),
@@ -62,7 +115,11 @@ class ComparatorTests(unittest.TestCase):
             (Comparator(2, 3), Comparator(0, 1), False),
             (Comparator(0, 2), Comparator(1, 3), True),
             (Comparator(0, 3), Comparator(1, 2), True),
-            (Comparator(1, 3), Comparator(0, 2), True)
+            (Comparator(1, 3), Comparator(0, 2), True),
+            (Comparator(0, 1), Comparator(0, 1), False),
+            (Comparator(0, 2), Comparator(2, 3), False),
+            (Comparator(0, 3), Comparator(0, 2), True),
+            (Comparator(1, 3), Comparator(0, 3), True),
         ]
         for c1, c2, expected in test_cases:
             with self.subTest(c1=c1, c2=c2):
@@ -83,6 +140,30 @@ class ComparatorTests(unittest.TestCase):
 
 
 class ComparisonNetworkTests(unittest.TestCase):
+    # Example comparison networks in the examples directory, without the file extension
+    EXAMPLES = (
+        "3-input",
+        "4-input",
+        "5-input",
+        "6-input",
+        "7-input",
+        "8-input",
+        "8-input-bitonic",
+        "9-input",
+        "10-input",
+        "11-input",
+        "12-input",
+        "16-input",
+        "20-input",
+        "24-input",
+    )
+
+    # Example comparison networks that take a long time to check
+    LARGE_EXAMPLES = (
+        "28-input",
+        "32-input",
+    )
+
     def test_comparison_network(self):
         cn = ComparisonNetwork()
         self.assertEqual(cn.comparators, [])
@@ -101,9 +182,22 @@ class ComparisonNetworkTests(unittest.TestCase):
         self.assertTrue(cn.is_sorting_network())
         self.assertEqual(cn.__str__(), "0:1")
         self.assertEqual(cn.__repr__(), "0:1")
+        svg = cn.svg()
+
+        cn.append(Comparator(1, 3))
+        self.assertEqual(cn.get_max_input(), 3)
+        self.assertEqual(cn.__str__(), "0:1\n1:3")
+        self.assertNotEqual(cn.svg(), svg)
+
+        cn.remove(Comparator(1, 3))
+        self.assertEqual(cn.get_max_input(), 1)
+        self.assertEqual(cn.__str__(), "0:1")
+        self.assertEqual(cn.svg(), svg)
 
         cn.remove(c)
         self.assertEqual(cn.comparators, [])
+        with self.assertRaises(ValueError):
+            cn.get_max_input()
 
         with self.assertRaises(ValueError):
             cn.remove(c)
@@ -114,26 +208,12 @@ class ComparisonNetworkTests(unittest.TestCase):
 
     def test_example_svg(self):
         self.maxDiff = None
-        test_cases = [
-            ("../examples/3-input.cn", "../examples/3-input.svg"),
-            ("../examples/4-input.cn", "../examples/4-input.svg"),
-            ("../examples/5-input.cn", "../examples/5-input.svg"),
-            ("../examples/6-input.cn", "../examples/6-input.svg"),
-            ("../examples/7-input.cn", "../examples/7-input.svg"),
-            ("../examples/8-input.cn", "../examples/8-input.svg"),
-            ("../examples/8-input-bitonic.cn", "../examples/8-input-bitonic.svg"),
-            ("../examples/9-input.cn", "../examples/9-input.svg"),
-            ("../examples/10-input.cn", "../examples/10-input.svg"),
-            ("../examples/11-input.cn", "../examples/11-input.svg"),
-            ("../examples/12-input.cn", "../examples/12-input.svg"),
-            ("../examples/16-input.cn", "../examples/16-input.svg"),
-        ]
-        for input_filename, svg_filename in test_cases:
+        for name in self.EXAMPLES + self.LARGE_EXAMPLES:
+            input_filename = f"../examples/{name}.cn"
+            svg_filename = f"../examples/{name}.svg"
             with self.subTest(inputFilename=input_filename, svgFilename=svg_filename):
-                cn = ComparisonNetwork.from_file(input_filename)
-                with open(svg_filename, "r") as f:
-                    expected_svg = f.read().strip()
-                self.assertEqual(cn.svg(), expected_svg)
+                cn = _load_comparison_network(input_filename)
+                self.assertEqual(cn.svg(), _load_svg(svg_filename))
 
     # https://github.com/brianpursley/sorting-network/issues/2
     def test_optimize_should_order_comparators_to_avoid_unnecessary_gaps(self):
@@ -152,23 +232,8 @@ class ComparisonNetworkTests(unittest.TestCase):
         self.assertEqual(cn.svg(), expected_svg)
 
     def test_is_sorting_network_should_identify_sorting_network(self):
-        file_test_cases = [
-            "../examples/3-input.cn",
-            "../examples/4-input.cn",
-            "../examples/5-input.cn",
-            "../examples/6-input.cn",
-            "../examples/7-input.cn",
-            "../examples/8-input.cn",
-            "../examples/8-input-bitonic.cn",
-            "../examples/9-input.cn",
-            "../examples/10-input.cn",
-            "../examples/11-input.cn",
-            "../examples/12-input.cn",
-            "../examples/16-input.cn",
-            "../examples/20-input.cn",
-            "../examples/24-input.cn",
-        ]
-        for input_filename in file_test_cases:
+        for name in self.EXAMPLES:
+            input_filename = f"../examples/{name}.cn"
             with self.subTest(inputFilename=input_filename):
                 self._test_is_sorting_network_from_file(input_filename)
 
@@ -184,39 +249,20 @@ class ComparisonNetworkTests(unittest.TestCase):
 
     @unittest.skipUnless(platform.python_implementation() == "PyPy", "slow tests only run when using pypy")
     def test_is_sorting_network_should_identify_large_sorting_network(self):
-        file_test_cases = [
-            "../examples/28-input.cn",
-            "../examples/32-input.cn",
-        ]
-        for input_filename in file_test_cases:
+        for name in self.LARGE_EXAMPLES:
+            input_filename = f"../examples/{name}.cn"
             with self.subTest(inputFilename=input_filename):
                 self._test_is_sorting_network_from_file(input_filename)
 
     def _test_is_sorting_network_from_file(self, input_filename):
-        cn = ComparisonNetwork.from_file(input_filename)
-        self.assertTrue(cn.is_sorting_network())
+        self.assertTrue(_is_sorting_network_file(input_filename))
 
     def test_is_sorting_network_should_identify_non_sorting_network(self):
         cn = ComparisonNetwork()
         self.assertFalse(cn.is_sorting_network())
 
-        file_test_cases = [
-            "../examples/3-input.cn",
-            "../examples/4-input.cn",
-            "../examples/5-input.cn",
-            "../examples/6-input.cn",
-            "../examples/7-input.cn",
-            "../examples/8-input.cn",
-            "../examples/8-input-bitonic.cn",
-            "../examples/9-input.cn",
-            "../examples/10-input.cn",
-            "../examples/11-input.cn",
-            "../examples/12-input.cn",
-            "../examples/16-input.cn",
-            "../examples/20-input.cn",
-            "../examples/24-input.cn",
-        ]
-        for input_filename in file_test_cases:
+        for name in self.EXAMPLES:
+            input_filename = f"../examples/{name}.cn"
             with self.subTest(inputFilename=input_filename):
                 self._test_is_non_sorting_network_from_file(input_filename)
 
@@ -224,6 +270,7 @@ class ComparisonNetworkTests(unittest.TestCase):
             "0:2",
             "1:2",
             "0:1,1:2",
+            "0:1,2:3",
             "0:1,1:3,0:1",
             "0:1,1:3,2:3",
             "0:1,1:3,2:3,0:3",
@@ -236,30 +283,63 @@ class ComparisonNetworkTests(unittest.TestCase):
 
     @unittest.skipUnless(platform.python_implementation() == "PyPy", "slow tests only run when using pypy")
     def test_is_sorting_network_should_identify_large_non_sorting_network(self):
-        file_test_cases = [
-            "../examples/28-input.cn",
-            "../examples/32-input.cn",
-        ]
-        for input_filename in file_test_cases:
+        for name in self.LARGE_EXAMPLES:
+            input_filename = f"../examples/{name}.cn"
             with self.subTest(inputFilename=input_filename):
                 self._test_is_non_sorting_network_from_file(input_filename)
 
     def _test_is_non_sorting_network_from_file(self, input_filename):
-        cn = ComparisonNetwork.from_file(input_filename)
+        cn = _load_comparison_network(input_filename)
         m = cn.get_max_input()
         # First confirm this is a sorting network, then systematically remove each comparator
         # and confirm it is no longer a sorting network.
-        self.assertTrue(cn.is_sorting_network())
-        for i in range(len(cn.comparators)):
-            cn2 = ComparisonNetwork()
-            cn2.comparators = cn.comparators.copy()
-            removed_comparator = cn2.comparators.pop(i)
-            if cn2.get_max_input() != m:
-                # Removing this comparator resulted in a network with fewer inputs, so skip this one
+        self.assertTrue(_is_sorting_network_file(input_filename))
+        comparators = cn.comparators
+        max_input_count = sum(1 for c in comparators if c.i2 == m)
+        for i, removed_comparator in enumerate(comparators):
+            if removed_comparator.i2 == m and max_input_count == 1:
+                # Removing this comparator would result in a network with fewer inputs, so skip this one
                 continue
+            cn2 = ComparisonNetwork()
+            cn2.comparators = comparators[:i] + comparators[i + 1:]
             if cn2.is_sorting_network():
                 self.fail(f"Unexpected sorting network after removing comparator {removed_comparator} from position {i}")
 
+    def test__is_sorting_network_depth_first(self):
+        test_cases = [
+            ("0:1", True),
+            ("0:1,1:2,0:1", True),
+            ("0:2,1:3,0:1,2:3,1:2", True),
+            ("0:1,1:2", False),
+            ("0:2,1:3,0:1,2:3", False),
+        ]
+        for s, expected in test_cases:
+            with self.subTest(s=s):
+                cn = ComparisonNetwork.from_string(s)
+                self.assertEqual(cn._is_sorting_network_depth_first(cn.get_max_input() + 1), expected)
+
+        cn = ComparisonNetwork.from_file("../examples/16-input.cn")
+        self.assertTrue(cn._is_sorting_network_depth_first(16))
+        self.assertTrue(cn._is_sorting_network_depth_first(16, jobs=2))
+        cn.remove(cn[-1])
+        self.assertFalse(cn._is_sorting_network_depth_first(16))
+        self.assertFalse(cn._is_sorting_network_depth_first(16, jobs=2))
+
+    def test__get_min_comparators(self):
+        test_cases = [
+            (2, 1),
+            (3, 3),
+            (4, 5),
+            (8, 19),
+            (12, 39),
+            (13, 43),
+            (16, 55),
+            (17, 60),
+        ]
+        for n, expected in test_cases:
+            with self.subTest(n=n):
+                self.assertEqual(ComparisonNetwork._get_min_comparators(n), expected)
+
     def test__optimize_comparator_depth_group(self):
         test_cases = [
             [Comparator(0, 2), Comparator(1, 5), Comparator(3, 4)],
@@ -313,6 +393,55 @@ class ComparisonNetworkTests(unittest.TestCase):
                 actual = cn.sort_binary_sequence(sequence)
                 self.assertEqual(actual, expected)
 
+    def test_sort_binary_sequences(self):
+        cn = ComparisonNetwork.from_string("0:1,1:2,0:1")
+        self.assertEqual(cn.sort_binary_sequences(range(8)), [0b000, 0b100, 0b100, 0b110, 0b100, 0b110, 0b110, 0b111])
+        self.assertEqual(cn.sort_binary_sequences([]), [])
+
+    def test_sort_binary_sequence_after_modifying_comparators(self):
+        cn = ComparisonNetwork.from_string("0:1")
+        self.assertEqual(cn.sort_binary_sequence(0b101), 0b110)
+        cn.append(Comparator(1, 2))
+        self.assertEqual(cn.sort_binary_sequence(0b101), 0b110)
+        self.assertEqual(cn.sort_binary_sequence(0b011), 0b101)
+        cn.remove(Comparator(0, 1))
+        self.assertEqual(cn.sort_binary_sequence(0b101), 0b101)
+        cn.comparators = [Comparator(0, 2)]
+        self.assertEqual(cn.sort_binary_sequence(0b001), 0b100)
+
+    def test_pickle_after_sort_binary_sequence(self):
+        cn = ComparisonNetwork.from_string("0:1,1:2,0:1")
+        self.assertEqual(cn.sort_binary_sequence(0b011), 0b110)
+        self.assertEqual(cn.__str__(), "0:1\n1:2\n0:1")
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            with self.subTest(protocol=protocol):
+                cn2 = pickle.loads(pickle.dumps(cn, protocol=protocol))
+                self.assertEqual(cn2.comparators, cn.comparators)
+                self.assertEqual(cn2.comparators[0].mask, 0b011)
+                self.assertEqual(cn2.sort_binary_sequence(0b001), 0b100)
+                self.assertEqual(cn2.__str__(), "0:1\n1:2\n0:1")
+                self.assertEqual(pickle.loads(pickle.dumps(ComparisonNetwork(), protocol=protocol)).comparators, [])
+
+    def test_modifying_comparators_in_place(self):
+        cn = ComparisonNetwork.from_string("0:1,1:2,0:2")
+        self.assertFalse(cn.is_sorting_network())
+        self.assertEqual(cn.sort_sequence([2, 1, 0]), [1, 0, 2])
+        self.assertEqual(cn.sort_binary_sequence(0b011), 0b101)
+        self.assertEqual(cn.__str__(), "0:1\n1:2\n0:2")
+        svg = cn.svg()
+
+        cn.comparators.append(Comparator(0, 1))
+        self.assertTrue(cn.is_sorting_network())
+        self.assertEqual(cn.sort_sequence([2, 1, 0]), [0, 1, 2])
+        self.assertEqual(cn.sort_binary_sequence(0b011), 0b110)
+        self.assertEqual(cn.__str__(), "0:1\n1:2\n0:2\n0:1")
+        self.assertNotEqual(cn.svg(), svg)
+
+        cn.comparators.pop()
+        cn.comparators.append(Comparator(0, 3))
+        self.assertEqual(cn.get_max_input(), 3)
+        self.assertEqual(cn.__str__(), "0:1\n1:2\n0:2\n0:3")
+
     def test_sort_sequence(self):
         test_cases = [
             ("0:1", [0, 1], [0, 1]),
@@ -331,6 +460,8 @@ class ComparisonNetworkTests(unittest.TestCase):
             ("0:1", ["a", "b"], ["a", "b"]),
             ("0:1", ["b", "a"], ["a", "b"]),
             ("0:1", ["b", "b"], ["b", "b"]),
+            # NaN is neither less than nor greater than anything, so adjacent pairs look in order but comparators still swap
+            ("0:2,0:1,1:2", [3, math.nan, 1], [1, math.nan, 3]),
         ]
         for s, sequence, expected in test_cases:
             with self.subTest(sequence=sequence, expected=expected):